@@ -0,0 +1,70 @@
+import csv
+from django.core.serializers.json import DjangoJSONEncoder
+from .models import Order
+from .serializers import OrderSerializer
+
+# Orders fetched per database round trip
+CHUNK_SIZE = 500
+
+CSV_ORDER_FIELDS = [
+    'id', 'display_number', 'customer_name', 'customer_phone', 'delivery_address',
+    'total_amount', 'status', 'created_at', 'updated_at', 'ready_at',
+    'completed_at', 'special_instructions',
+]
+CSV_ITEM_FIELDS = ['name', 'quantity', 'price', 'special_instructions']
+
+# Spreadsheets treat cells starting with these as formulas
+CSV_FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def export_queryset(created_from=None, created_to=None, statuses=None):
+    queryset = Order.objects.all()
+    if created_from:
+        queryset = queryset.filter(created_at__gte=created_from)
+    if created_to:
+        queryset = queryset.filter(created_at__lt=created_to)
+    if statuses:
+        queryset = queryset.filter(status__in=statuses)
+    # Items come from Order.items_snapshot, so no prefetch is needed
+    return queryset.order_by('created_at', 'id')
+
+
+def iter_orders(queryset):
+    """Serialized orders, fetched CHUNK_SIZE at a time so memory stays flat"""
+    for order in queryset.iterator(chunk_size=CHUNK_SIZE):
+        yield OrderSerializer(order).data
+
+
+def ndjson_rows(queryset):
+    """One JSON object per line, items nested as in the API"""
+    encoder = DjangoJSONEncoder()
+    for order in iter_orders(queryset):
+        yield encoder.encode(order) + '\n'
+
+
+def _csv_cell(value):
+    """Quote customer-entered text that a spreadsheet would run as a formula"""
+    if isinstance(value, str) and value.startswith(CSV_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+class _Line:
+    """File-like target for csv.writer that hands back the last written line"""
+    def write(self, value):
+        return value
+
+
+def csv_rows(queryset):
+    """One row per item, prefixed with its order's columns"""
+    writer = csv.writer(_Line())
+    yield writer.writerow(
+        CSV_ORDER_FIELDS + [f'item_{field}' for field in CSV_ITEM_FIELDS]
+    )
+    for order in iter_orders(queryset):
+        order_columns = [_csv_cell(order[field]) for field in CSV_ORDER_FIELDS]
+        # Orders without items still get a row
+        for item in order['items'] or [{}]:
+            yield writer.writerow(
+                order_columns + [_csv_cell(item.get(field)) for field in CSV_ITEM_FIELDS]
+            )
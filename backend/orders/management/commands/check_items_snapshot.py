@@ -0,0 +1,42 @@
+import json
+from django.core.management.base import BaseCommand
+from django.db.models import Prefetch
+from django.utils import timezone
+from orders.models import Order, OrderItem
+from orders.serializers import build_items_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Compare Order.items_snapshot with the OrderItem table and optionally rebuild drifted snapshots'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fix', action='store_true',
+            help='Rewrite drifted or missing snapshots from OrderItem rows',
+        )
+
+    def handle(self, *args, **options):
+        orders = Order.objects.prefetch_related(
+            Prefetch('items', queryset=OrderItem.objects.order_by('id'))
+        ).order_by('created_at')
+
+        checked = drifted = 0
+        for order in orders.iterator(chunk_size=500):
+            checked += 1
+            expected = build_items_snapshot(order.items.all())
+            # Round-trip through JSON so Decimal/str differences don't count as drift
+            if json.loads(json.dumps(expected)) == order.items_snapshot:
+                continue
+            drifted += 1
+            self.stdout.write(f'Order {order.id}: items snapshot out of sync')
+            if options['fix']:
+                # update() skips auto_now, so bump updated_at by hand: the
+                # order list ETag must change or pollers keep the stale items
+                Order.objects.filter(pk=order.pk).update(
+                    items_snapshot=expected, updated_at=timezone.now()
+                )
+
+        action = 'fixed' if options['fix'] else 'found'
+        self.stdout.write(f'Checked {checked} orders, {action} {drifted} drifted snapshots')
+        if drifted and not options['fix']:
+            self.stdout.write('Run with --fix to rebuild them')
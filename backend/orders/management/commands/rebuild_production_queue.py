@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from orders.production import rebuild_production_queue
+
+
+class Command(BaseCommand):
+    help = 'Compare production queue totals with accepted/delayed order items and optionally rebuild them'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fix', action='store_true',
+            help='Rewrite drifted totals from OrderItem rows',
+        )
+
+    def handle(self, *args, **options):
+        drift = rebuild_production_queue(fix=options['fix'])
+        for name, instructions, stored, expected in drift:
+            label = f'{name} ({instructions})' if instructions else name
+            self.stdout.write(f'{label}: stored {stored}, expected {expected}')
+
+        action = 'fixed' if options['fix'] else 'found'
+        self.stdout.write(f'{action.capitalize()} {len(drift)} drifted production queue totals')
+        if drift and not options['fix']:
+            self.stdout.write('Run with --fix to rebuild them')
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from orders.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Recreate the order full-text search index from the orders table'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            count = rebuild_index()
+        self.stdout.write(f'Indexed {count} orders')
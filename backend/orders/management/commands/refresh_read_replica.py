@@ -0,0 +1,50 @@
+import os
+import sqlite3
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from orders.routers import replica_path, write_refresh_marker
+
+
+class Command(BaseCommand):
+    help = 'Copy the SQLite primary into each file-based read replica'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help='Keep refreshing every N seconds instead of copying once',
+        )
+
+    def handle(self, *args, **options):
+        primary = str(settings.DATABASES['default']['NAME'])
+        targets = [
+            replica_path(alias) for alias in settings.READ_REPLICAS
+            if replica_path(alias) != primary
+        ]
+        if not targets:
+            self.stdout.write('No file-based read replicas configured (see READ_REPLICAS)')
+            return
+
+        while True:
+            for target in targets:
+                self.refresh(primary, target)
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
+
+    def refresh(self, primary, target):
+        # Copy into a temp file and swap it in, so readers never see a partial copy
+        tmp = f'{target}.tmp'
+        started = time.time()
+        source = sqlite3.connect(primary)
+        dest = sqlite3.connect(tmp)
+        try:
+            source.backup(dest)
+            dest.execute('PRAGMA journal_mode=DELETE')
+            # The router measures replica lag from this marker
+            write_refresh_marker(dest, started)
+        finally:
+            dest.close()
+            source.close()
+        os.replace(tmp, target)
+        self.stdout.write(f'Refreshed read replica {target}')
@@ -0,0 +1,65 @@
+from django.db import migrations
+
+# FTS5 index over order text fields and item names. orders_order_fts_key maps
+# each order id to a stable integer rowid in the index, so nothing depends on
+# orders_order's implicit rowid and no trigger references orders_order (both
+# would break Django's table rebuilds). orders.search keeps the index in sync
+# from Python.
+FORWARD_SQL = [
+    """
+    CREATE TABLE orders_order_fts_key (
+        rowid INTEGER PRIMARY KEY,
+        order_id VARCHAR(50) NOT NULL UNIQUE
+    )
+    """,
+    """
+    CREATE VIRTUAL TABLE orders_order_fts USING fts5(
+        order_id UNINDEXED,
+        customer_name,
+        customer_phone,
+        delivery_address,
+        special_instructions,
+        item_names,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+    """,
+    # Backfill existing history
+    'INSERT INTO orders_order_fts_key (order_id) SELECT id FROM orders_order',
+    """
+    INSERT INTO orders_order_fts (
+        rowid, order_id, customer_name, customer_phone, delivery_address,
+        special_instructions, item_names
+    )
+    SELECT k.rowid, o.id, o.customer_name, o.customer_phone, o.delivery_address,
+        coalesce(o.special_instructions, ''),
+        coalesce((SELECT group_concat(i.name, ' ') FROM orders_orderitem i WHERE i.order_id = o.id), '')
+    FROM orders_order o JOIN orders_order_fts_key k ON k.order_id = o.id
+    """,
+]
+
+REVERSE_SQL = [
+    'DROP TABLE IF EXISTS orders_order_fts',
+    'DROP TABLE IF EXISTS orders_order_fts_key',
+]
+
+
+def run_sqlite(statements):
+    def run(apps, schema_editor):
+        # Other databases fall back to LIKE filtering in orders.search
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0004_order_display_number'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_sqlite(FORWARD_SQL), run_sqlite(REVERSE_SQL)),
+    ]
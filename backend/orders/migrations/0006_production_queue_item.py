@@ -0,0 +1,48 @@
+# Generated by Django 4.2.7 on 2026-10-19 11:03
+
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def backfill_production_queue(apps, schema_editor):
+    # Inlined rather than imported from orders.production, so later changes
+    # there can't alter what this migration does
+    OrderItem = apps.get_model('orders', 'OrderItem')
+    ProductionQueueItem = apps.get_model('orders', 'ProductionQueueItem')
+    totals = {}
+    rows = (
+        OrderItem.objects.filter(order__status__in=['accepted', 'delayed'])
+        .values('name', 'special_instructions')
+        .annotate(total=Sum('quantity'))
+    )
+    for row in rows:
+        key = (row['name'], (row['special_instructions'] or '').strip())
+        totals[key] = totals.get(key, 0) + row['total']
+    ProductionQueueItem.objects.bulk_create([
+        ProductionQueueItem(name=name, special_instructions=instructions, quantity=quantity)
+        for (name, instructions), quantity in totals.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0005_order_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductionQueueItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200)),
+                ('special_instructions', models.TextField(blank=True, default='')),
+                ('quantity', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'unique_together': {('name', 'special_instructions')},
+            },
+        ),
+        migrations.RunPython(backfill_production_queue, migrations.RunPython.noop),
+    ]
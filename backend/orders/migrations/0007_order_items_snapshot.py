@@ -0,0 +1,35 @@
+# Generated by Django 4.2.7 on 2026-10-19 11:11
+
+from django.db import migrations, models
+
+
+def backfill_items_snapshot(apps, schema_editor):
+    Order = apps.get_model('orders', 'Order')
+    OrderItem = apps.get_model('orders', 'OrderItem')
+    snapshots = {}
+    for item in OrderItem.objects.order_by('id').iterator():
+        snapshots.setdefault(item.order_id, []).append({
+            'name': item.name,
+            'quantity': item.quantity,
+            'price': f'{item.price:.2f}',
+            'special_instructions': item.special_instructions,
+        })
+    for order in Order.objects.only('id').iterator():
+        order.items_snapshot = snapshots.get(order.id, [])
+        order.save(update_fields=['items_snapshot'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0006_production_queue_item'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='items_snapshot',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_items_snapshot, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-19 11:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0007_order_items_snapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PollBucket',
+            fields=[
+                ('key', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('tokens', models.FloatField()),
+                ('refilled_at', models.FloatField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PollWindow',
+            fields=[
+                ('window', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('polls', models.IntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -24,6 +24,9 @@ class Order(models.Model):
     ready_at = models.DateTimeField(null=True, blank=True)  # When food became ready
     completed_at = models.DateTimeField(null=True, blank=True)
     special_instructions = models.TextField(blank=True, null=True)
+    # Read model: items as rendered by OrderItemSerializer, written once at
+    # ingest so hot reads skip the OrderItem query (see check_items_snapshot)
+    items_snapshot = models.JSONField(null=True, blank=True)
     
     def save(self, *args, **kwargs):
         # Auto-assign display_number if not set
@@ -49,3 +52,31 @@ class OrderItem(models.Model):
     
     def __str__(self):
         return f"{self.quantity}x {self.name}"
+
+class ProductionQueueItem(models.Model):
+    """Running total of one menu item across all accepted and delayed orders.
+
+    Maintained incrementally by orders.production; rows are kept at zero
+    rather than deleted so max(updated_at) always moves forward for the ETag.
+    """
+    name = models.CharField(max_length=200)
+    special_instructions = models.TextField(blank=True, default='')
+    quantity = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('name', 'special_instructions')
+
+    def __str__(self):
+        return f"{self.quantity}x {self.name}"
+
+class PollBucket(models.Model):
+    """Token bucket for one polling client, shared by all workers (see orders.pacing)"""
+    key = models.CharField(max_length=100, primary_key=True)
+    tokens = models.FloatField()
+    refilled_at = models.FloatField()  # Unix time of the last refill
+
+class PollWindow(models.Model):
+    """Number of order-list polls in one LOAD_WINDOW_SECONDS window"""
+    window = models.BigIntegerField(primary_key=True)
+    polls = models.IntegerField(default=0)
@@ -0,0 +1,135 @@
+import math
+import time
+from django.conf import settings
+from django.db import IntegrityError, OperationalError, transaction
+from django.db.models import ExpressionWrapper, F, FloatField, Max, Value
+from django.db.models.functions import Least
+from django.db.models.lookups import GreaterThanOrEqual
+from django.utils import timezone
+from rest_framework.throttling import BaseThrottle
+from .models import Order, PollBucket, PollWindow
+from .routers import PACING_DATABASE
+
+# Window over which global poll load is counted
+LOAD_WINDOW_SECONDS = 5
+# Buckets untouched for this long are full again and can be dropped
+BUCKET_EXPIRY_SECONDS = 3600
+
+
+def client_address(request):
+    """The client's address from DRF's get_ident().
+
+    get_ident() only trusts the X-Forwarded-For hops appended by the
+    NUM_PROXIES proxies we run.
+    """
+    return BaseThrottle().get_ident(request)
+
+
+def client_key(request):
+    """Identify a polling client by its X-Client-Id header, else its address.
+
+    The header is unauthenticated, so take_token() also limits the address
+    the request comes from.
+    """
+    client_id = request.META.get('HTTP_X_CLIENT_ID')
+    if client_id:
+        return f'client:{client_id[:64]}'
+    return f'addr:{client_address(request)}'
+
+
+def _spend(key, capacity, rate, now):
+    """Spend one token from a bucket; returns 0 or seconds until a token is available"""
+    available = ExpressionWrapper(
+        Least(Value(float(capacity)), F('tokens') + (Value(now) - F('refilled_at')) * Value(rate)),
+        output_field=FloatField(),
+    )
+    for _ in range(2):
+        spent = PollBucket.objects.filter(
+            GreaterThanOrEqual(available, Value(1.0)), key=key,
+        ).update(tokens=available - Value(1.0), refilled_at=Value(now))
+        if spent:
+            return 0
+
+        bucket = PollBucket.objects.filter(key=key).first()
+        if bucket is not None:
+            tokens = min(capacity, bucket.tokens + (now - bucket.refilled_at) * rate)
+            return max(math.ceil((1 - tokens) / rate), 1)
+
+        try:
+            with transaction.atomic(using=PACING_DATABASE):
+                PollBucket.objects.create(key=key, tokens=capacity - 1, refilled_at=now)
+            return 0
+        except IntegrityError:
+            # Another worker created it first; spend from that bucket instead
+            continue
+    return 1
+
+
+def take_token(request):
+    """Spend one token from the address's bucket and one from the client's.
+
+    Returns 0 if the request may proceed, otherwise the number of seconds
+    until a token is available (for Retry-After). Buckets live in the
+    'pacing' database so every worker shares them without taking the
+    orders database's write lock, and a token is spent with a single
+    conditional UPDATE so concurrent polls can't both take the last one.
+
+    The address bucket holds POLL_CLIENTS_PER_ADDRESS clients' worth of
+    tokens, so inventing X-Client-Id values doesn't get past it, and new
+    client buckets can only be created at its refill rate.
+    """
+    rate = settings.POLL_REFILL_RATE
+    now = time.time()
+    try:
+        per_address = settings.POLL_CLIENTS_PER_ADDRESS
+        retry_after = _spend(
+            f'ip:{client_address(request)}', settings.POLL_BURST * per_address, rate * per_address, now
+        )
+        if retry_after:
+            return retry_after
+        return _spend(client_key(request), settings.POLL_BURST, rate, now)
+    except OperationalError:
+        # The pacing database is locked by other polls: we are flooded, so shed
+        return max(math.ceil(1 / rate), 1)
+
+
+def record_poll():
+    """Count a poll in the current load window and return the polls per second"""
+    now = time.time()
+    window = int(now // LOAD_WINDOW_SECONDS)
+    try:
+        if not PollWindow.objects.filter(window=window).update(polls=F('polls') + 1):
+            try:
+                with transaction.atomic(using=PACING_DATABASE):
+                    PollWindow.objects.create(window=window, polls=1)
+                # First poll of a new window: prune old windows and idle buckets
+                PollWindow.objects.filter(window__lt=window - 1).delete()
+                PollBucket.objects.filter(refilled_at__lt=now - BUCKET_EXPIRY_SECONDS).delete()
+            except IntegrityError:
+                PollWindow.objects.filter(window=window).update(polls=F('polls') + 1)
+        polls = PollWindow.objects.filter(window=window).values_list('polls', flat=True).first() or 1
+    except OperationalError:
+        # Lock contention on the pacing database means heavy polling; back clients off
+        return settings.POLL_TARGET_RATE * 2
+    return polls / LOAD_WINDOW_SECONDS
+
+
+def recommended_interval(polls_per_second):
+    """Seconds until the client should poll again.
+
+    Recent changes pull the interval toward the minimum, a quiet dataset
+    lets it drift up to the maximum over a minute, and load above
+    POLL_TARGET_RATE stretches it proportionally for everyone.
+    """
+    low = settings.POLL_MIN_INTERVAL_SECONDS
+    high = settings.POLL_MAX_INTERVAL_SECONDS
+
+    latest = Order.objects.aggregate(latest=Max('updated_at'))['latest']
+    if latest is None:
+        interval = high
+    else:
+        quiet_for = (timezone.now() - latest).total_seconds()
+        interval = low + (high - low) * min(max(quiet_for, 0) / 60, 1)
+
+    load_factor = max(polls_per_second / settings.POLL_TARGET_RATE, 1)
+    return round(interval * load_factor, 1)
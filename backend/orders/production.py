@@ -0,0 +1,89 @@
+import hashlib
+from django.db import transaction
+from django.db.models import F, Max, Sum
+from .models import OrderItem, ProductionQueueItem
+
+# Orders in these statuses are still to be cooked
+ACTIVE_STATUSES = {'accepted', 'delayed'}
+
+
+def _adjust(items, sign):
+    """Add (sign=1) or remove (sign=-1) an order's items from the running totals"""
+    with transaction.atomic():
+        for item in items:
+            row, _ = ProductionQueueItem.objects.get_or_create(
+                name=item.name,
+                special_instructions=(item.special_instructions or '').strip(),
+            )
+            # save() rather than update() so auto_now bumps updated_at
+            row.quantity = F('quantity') + sign * item.quantity
+            row.save(update_fields=['quantity', 'updated_at'])
+
+
+def apply_status_change(order, old_status, new_status):
+    """Update the production queue for an order moving between statuses.
+
+    Call with old_status=None for a newly created order.
+    """
+    was_active = old_status in ACTIVE_STATUSES
+    is_active = new_status in ACTIVE_STATUSES
+    if was_active == is_active:
+        return
+    _adjust(order.items.all(), 1 if is_active else -1)
+
+
+def production_totals():
+    """Expected {(name, special_instructions): quantity} from the OrderItem table"""
+    totals = {}
+    rows = (
+        OrderItem.objects.filter(order__status__in=ACTIVE_STATUSES)
+        .values('name', 'special_instructions')
+        .annotate(total=Sum('quantity'))
+    )
+    for row in rows:
+        key = (row['name'], (row['special_instructions'] or '').strip())
+        totals[key] = totals.get(key, 0) + row['total']
+    return totals
+
+
+def rebuild_production_queue(fix=False):
+    """Compare running totals with the OrderItem table.
+
+    Returns [(name, special_instructions, stored, expected)] for every
+    drifted row; with fix=True those rows are rewritten (bumping updated_at,
+    so the production queue ETag changes).
+    """
+    with transaction.atomic():
+        expected = production_totals()
+        stored = {
+            (row.name, row.special_instructions): row
+            for row in ProductionQueueItem.objects.select_for_update()
+        }
+        drift = []
+        for key in set(expected) | set(stored):
+            row = stored.get(key)
+            quantity = expected.get(key, 0)
+            if row is not None and row.quantity == quantity:
+                continue
+            drift.append((key[0], key[1], row.quantity if row else 0, quantity))
+            if fix:
+                if row is None:
+                    row = ProductionQueueItem(name=key[0], special_instructions=key[1])
+                row.quantity = quantity
+                row.save()
+    return drift
+
+
+def production_queue():
+    return ProductionQueueItem.objects.filter(quantity__gt=0).order_by('-quantity', 'name')
+
+
+def production_queue_etag(request):
+    """ETag for the production queue, based on the latest total change"""
+    latest = ProductionQueueItem.objects.aggregate(latest=Max('updated_at'))['latest']
+    if latest is None:
+        return None
+    # JSON and msgpack bodies are different representations, so need distinct ETags
+    renderer = getattr(request, 'accepted_renderer', None)
+    etag_source = f"{latest.isoformat()}-{renderer.format if renderer else 'json'}"
+    return hashlib.md5(etag_source.encode()).hexdigest()
@@ -0,0 +1,157 @@
+import random
+import threading
+import time
+from contextlib import contextmanager
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, connections
+from django.db.models import Count, Max
+
+_state = threading.local()
+
+# Poll pacing state, kept in the 'pacing' database (see settings.DATABASES)
+PACING_DATABASE = 'pacing'
+PACING_MODELS = {'pollbucket', 'pollwindow'}
+
+# Table refresh_read_replica writes into each copy: the Unix time the copy started
+REFRESH_MARKER_TABLE = 'replica_refresh'
+
+# Cached replica lag per alias: {alias: (checked_at, lag_seconds)}
+_lag_cache = {}
+_lag_lock = threading.Lock()
+
+
+@contextmanager
+def use_primary():
+    """Route every read inside this block to the primary database.
+
+    Used for writes and read-your-own-writes paths (e.g. the response to a
+    PATCH) so they never observe a stale replica.
+    """
+    _state.depth = getattr(_state, 'depth', 0) + 1
+    try:
+        yield
+    finally:
+        _state.depth -= 1
+
+
+def pinned_to_primary():
+    return getattr(_state, 'depth', 0) > 0
+
+
+def pin_client_to_primary(client_key):
+    """After a write, serve this client's reads from the primary for a while.
+
+    The pin lives in the shared cache for REPLICA_MAX_LAG_SECONDS, the
+    longest a replica may trail, so e.g. the dashboard's refresh() right
+    after a PATCH sees the new status. This worker's cached lag readings
+    predate the write, so they are dropped too.
+    """
+    cache.set(f'primary-pin:{client_key}', True, timeout=settings.REPLICA_MAX_LAG_SECONDS)
+    with _lag_lock:
+        _lag_cache.clear()
+
+
+def client_pinned_to_primary(client_key):
+    return bool(cache.get(f'primary-pin:{client_key}'))
+
+
+def replica_path(alias):
+    """Filesystem path of a replica alias ('file:<path>?mode=ro')"""
+    name = str(settings.DATABASES[alias]['NAME'])
+    return name[len('file:'):].split('?', 1)[0]
+
+
+def write_refresh_marker(connection, refreshed_at):
+    """Stamp a replica copy (an sqlite3 connection) with the time it was taken"""
+    connection.execute(f'CREATE TABLE IF NOT EXISTS {REFRESH_MARKER_TABLE} (refreshed_at REAL NOT NULL)')
+    connection.execute(f'DELETE FROM {REFRESH_MARKER_TABLE}')
+    connection.execute(f'INSERT INTO {REFRESH_MARKER_TABLE} (refreshed_at) VALUES (?)', [refreshed_at])
+    connection.commit()
+
+
+def replica_lag(alias):
+    """Seconds the replica may have been missing writes for.
+
+    A copy is behind only if the primary changed after it was taken (its
+    latest updated_at or its order count differs, the latter catching
+    deletes). It has then been missing writes for at most the time since
+    the refresh marker, which keeps growing if refresh_read_replica dies.
+    A read-only connection to the primary file itself never lags.
+
+    The result is cached for REPLICA_LAG_CHECK_INTERVAL seconds so polling
+    traffic doesn't turn into extra queries per request.
+    """
+    from .models import Order
+
+    now = time.monotonic()
+    with _lag_lock:
+        cached = _lag_cache.get(alias)
+    if cached and now - cached[0] < settings.REPLICA_LAG_CHECK_INTERVAL:
+        return cached[1]
+
+    if replica_path(alias) == str(settings.DATABASES['default']['NAME']):
+        lag = 0.0
+    else:
+        try:
+            with connections[alias].cursor() as cursor:
+                cursor.execute(f'SELECT refreshed_at FROM {REFRESH_MARKER_TABLE}')
+                marker = cursor.fetchone()
+            replica_state = Order.objects.using(alias).aggregate(latest=Max('updated_at'), count=Count('pk'))
+        except DatabaseError:
+            # Missing, half-copied or unmarked replica file: never read from it
+            marker = None
+        if marker is None:
+            lag = float('inf')
+        else:
+            primary_state = Order.objects.using('default').aggregate(latest=Max('updated_at'), count=Count('pk'))
+            if primary_state == replica_state:
+                lag = 0.0
+            else:
+                lag = max(time.time() - marker[0], 0.0)
+
+    with _lag_lock:
+        _lag_cache[alias] = (now, lag)
+    return lag
+
+
+class PrimaryReplicaRouter:
+    """Send reads to READ_REPLICAS and writes to the primary ('default').
+
+    Reads fall back to the primary when no replica is configured, when the
+    caller is inside use_primary(), or when every replica trails the primary
+    by more than REPLICA_MAX_LAG_SECONDS. Poll pacing models always use
+    the 'pacing' database.
+    """
+
+    def _pacing(self, app_label, model_name):
+        return app_label == 'orders' and model_name in PACING_MODELS
+
+    def db_for_read(self, model, **hints):
+        if self._pacing(model._meta.app_label, model._meta.model_name):
+            return PACING_DATABASE
+        replicas = list(getattr(settings, 'READ_REPLICAS', []))
+        if not replicas or pinned_to_primary():
+            return 'default'
+
+        random.shuffle(replicas)
+        max_lag = settings.REPLICA_MAX_LAG_SECONDS
+        for alias in replicas:
+            if replica_lag(alias) <= max_lag:
+                return alias
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        if self._pacing(model._meta.app_label, model._meta.model_name):
+            return PACING_DATABASE
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Every alias holds the same data, so cross-alias relations are fine
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if self._pacing(app_label, model_name):
+            return db == PACING_DATABASE
+        # Replicas are copies of (or connections to) the primary
+        return db == 'default'
@@ -0,0 +1,153 @@
+from django.db import connections, router
+from django.db.models import Q
+from .models import Order
+
+# Column weights for bm25(): name and phone matches rank above address,
+# item and instruction matches (order_id is unindexed but still takes a slot)
+BM25_WEIGHTS = (0.0, 10.0, 8.0, 4.0, 1.0, 2.0)
+
+# FTS5 index over order text fields and item names. orders_order_fts_key maps
+# each order id to a stable integer rowid in the index, so nothing depends on
+# orders_order's implicit rowid and no trigger touches orders_order (both
+# would break Django's table rebuilds). The index is kept in sync from Python
+# by index_order()/unindex_order(); see the rebuild_search_index command.
+INDEX_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS orders_order_fts_key (
+        rowid INTEGER PRIMARY KEY,
+        order_id VARCHAR(50) NOT NULL UNIQUE
+    )
+    """,
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS orders_order_fts USING fts5(
+        order_id UNINDEXED,
+        customer_name,
+        customer_phone,
+        delivery_address,
+        special_instructions,
+        item_names,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+    """,
+]
+DROP_INDEX = [
+    'DROP TABLE IF EXISTS orders_order_fts',
+    'DROP TABLE IF EXISTS orders_order_fts_key',
+]
+
+
+def _index_connection():
+    """Connection holding the index, or None when the database has no FTS5"""
+    connection = connections[router.db_for_write(Order)]
+    return connection if connection.vendor == 'sqlite' else None
+
+
+def _item_names(order):
+    if order.items_snapshot is not None:
+        return ' '.join(item['name'] for item in order.items_snapshot)
+    return ' '.join(item.name for item in order.items.all())
+
+
+def _write_entry(cursor, order):
+    cursor.execute(
+        'INSERT INTO orders_order_fts_key (order_id) VALUES (%s) ON CONFLICT (order_id) DO NOTHING',
+        [order.id],
+    )
+    cursor.execute('SELECT rowid FROM orders_order_fts_key WHERE order_id = %s', [order.id])
+    rowid = cursor.fetchone()[0]
+    cursor.execute('DELETE FROM orders_order_fts WHERE rowid = %s', [rowid])
+    cursor.execute(
+        'INSERT INTO orders_order_fts (rowid, order_id, customer_name, customer_phone, '
+        'delivery_address, special_instructions, item_names) VALUES (%s, %s, %s, %s, %s, %s, %s)',
+        [rowid, order.id, order.customer_name, order.customer_phone,
+         order.delivery_address, order.special_instructions or '', _item_names(order)],
+    )
+
+
+def index_order(order):
+    """Add or refresh an order's search entry (call after its items exist)"""
+    connection = _index_connection()
+    if connection is None:
+        return
+    with connection.cursor() as cursor:
+        _write_entry(cursor, order)
+
+
+def unindex_order(order_id):
+    connection = _index_connection()
+    if connection is None:
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT rowid FROM orders_order_fts_key WHERE order_id = %s', [order_id])
+        row = cursor.fetchone()
+        if row:
+            cursor.execute('DELETE FROM orders_order_fts WHERE rowid = %s', [row[0]])
+            cursor.execute('DELETE FROM orders_order_fts_key WHERE rowid = %s', [row[0]])
+
+
+def rebuild_index(chunk_size=500):
+    """Drop and recreate the index from the orders table; returns orders indexed"""
+    connection = _index_connection()
+    if connection is None:
+        return 0
+    count = 0
+    with connection.cursor() as cursor:
+        for statement in DROP_INDEX + INDEX_SCHEMA:
+            cursor.execute(statement)
+        for order in Order.objects.using(connection.alias).iterator(chunk_size=chunk_size):
+            _write_entry(cursor, order)
+            count += 1
+    return count
+
+
+def fts_query(text):
+    """Turn free text into an FTS5 query: every term must match as a prefix.
+
+    Terms are quoted so user input like "+1-555" or "O'Brien" can't be
+    parsed as FTS5 syntax.
+    """
+    terms = [term.replace('"', '""') for term in text.split()]
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def search_orders(text, limit, offset):
+    """Return (total_count, [Order]) for a search, best matches first.
+
+    Runs against the FTS5 index (INDEX_SCHEMA) on SQLite and falls back
+    to an unranked icontains filter on other databases.
+    """
+    alias = router.db_for_read(Order)
+    connection = connections[alias]
+    queryset = Order.objects.using(alias)
+
+    if connection.vendor != 'sqlite':
+        q = Q()
+        for term in text.split():
+            q &= (
+                Q(customer_name__icontains=term)
+                | Q(customer_phone__icontains=term)
+                | Q(delivery_address__icontains=term)
+                | Q(special_instructions__icontains=term)
+                | Q(items__name__icontains=term)
+            )
+        matches = queryset.filter(q).distinct().order_by('-created_at')
+        return matches.count(), list(matches[offset:offset + limit])
+
+    match = fts_query(text)
+    weights = ', '.join(str(w) for w in BM25_WEIGHTS)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT count(*) FROM orders_order_fts WHERE orders_order_fts MATCH %s',
+            [match],
+        )
+        total = cursor.fetchone()[0]
+        cursor.execute(
+            f'SELECT order_id FROM orders_order_fts WHERE orders_order_fts MATCH %s '
+            f'ORDER BY bm25(orders_order_fts, {weights}), rowid DESC LIMIT %s OFFSET %s',
+            [match, limit, offset],
+        )
+        ids = [row[0] for row in cursor.fetchall()]
+
+    orders = queryset.in_bulk(ids)
+    return total, [orders[order_id] for order_id in ids if order_id in orders]
@@ -1,10 +1,27 @@
+import decimal
+from django.db import models, transaction
 from rest_framework import serializers
-from .models import Order, OrderItem
+from .models import Order, OrderItem, ProductionQueueItem
+from .production import apply_status_change
+from .search import index_order
+
+class SnapshotItemsListSerializer(serializers.ListSerializer):
+    """Read items from Order.items_snapshot, falling back to the OrderItem table"""
+    def get_attribute(self, instance):
+        snapshot = getattr(instance, 'items_snapshot', None)
+        if snapshot is not None:
+            return snapshot
+        return super().get_attribute(instance)
 
 class OrderItemSerializer(serializers.ModelSerializer):
     class Meta:
         model = OrderItem
         fields = ['name', 'quantity', 'price', 'special_instructions']
+        list_serializer_class = SnapshotItemsListSerializer
+
+def build_items_snapshot(items):
+    """Items (OrderItem instances) in the shape stored in Order.items_snapshot"""
+    return [dict(item) for item in OrderItemSerializer(items, many=True).data]
 
 class OrderSerializer(serializers.ModelSerializer):
     items = OrderItemSerializer(many=True)
@@ -18,9 +35,43 @@ class OrderSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['display_number', 'created_at', 'updated_at', 'ready_at', 'completed_at']
     
+    @transaction.atomic
     def create(self, validated_data):
         items_data = validated_data.pop('items')
-        order = Order.objects.create(**validated_data)
+        items_snapshot = build_items_snapshot([OrderItem(**item_data) for item_data in items_data])
+        order = Order.objects.create(items_snapshot=items_snapshot, **validated_data)
         for item_data in items_data:
             OrderItem.objects.create(order=order, **item_data)
+        apply_status_change(order, None, order.status)
+        index_order(order)
         return order
+
+class CentsField(serializers.DecimalField):
+    """Decimal amount rendered as integer cents"""
+    def to_representation(self, value):
+        # Snapshot items hold amounts as decimal strings
+        return int((decimal.Decimal(str(value)) * 100).to_integral_value())
+
+class EpochMillisField(serializers.DateTimeField):
+    """Datetime rendered as milliseconds since the Unix epoch"""
+    def to_representation(self, value):
+        return int(value.timestamp() * 1000)
+
+class CompactFieldsMixin:
+    """Swap decimals and datetimes for integer encodings (binary wire format)"""
+    serializer_field_mapping = {
+        **serializers.ModelSerializer.serializer_field_mapping,
+        models.DecimalField: CentsField,
+        models.DateTimeField: EpochMillisField,
+    }
+
+class CompactOrderItemSerializer(CompactFieldsMixin, OrderItemSerializer):
+    pass
+
+class CompactOrderSerializer(CompactFieldsMixin, OrderSerializer):
+    items = CompactOrderItemSerializer(many=True)
+
+class ProductionQueueItemSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ProductionQueueItem
+        fields = ['name', 'special_instructions', 'quantity']
@@ -1,3 +1,498 @@
-from django.test import TestCase
+import csv
+import json
+import os
+import sqlite3
+import tempfile
+import time
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+import msgpack
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import OperationalError, connections
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.utils.dateparse import parse_datetime
+from .models import Order, PollBucket, ProductionQueueItem
+from .pacing import record_poll, take_token
+from .renderers import TABLE_EXT_TYPE
+from .routers import _lag_cache, replica_lag, write_refresh_marker
+from .views import OrderDetailView
 
-# Create your tests here.
+
+def order_payload(order_id, customer_name='Jane Doe', items=None, **fields):
+    payload = {
+        'id': order_id,
+        'customer_name': customer_name,
+        'customer_phone': '+1-555-0100',
+        'delivery_address': '1 Oak Street',
+        'total_amount': '12.50',
+        'items': items or [{'name': 'Margherita Pizza', 'quantity': 2, 'price': '6.25'}],
+    }
+    payload.update(fields)
+    return payload
+
+
+class OrderAPITestCase(TestCase):
+    databases = {'default', 'pacing'}
+
+    def create_order(self, order_id, **kwargs):
+        response = self.client.post(
+            '/api/orders/', json.dumps(order_payload(order_id, **kwargs)),
+            content_type='application/json', HTTP_HOST='localhost'
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+        return response
+
+    def set_status(self, order_id, new_status):
+        # cancelled_by=kyte skips the outgoing webhook
+        response = self.client.patch(
+            f'/api/orders/{order_id}/',
+            json.dumps({'status': new_status, 'cancelled_by': 'kyte'}),
+            content_type='application/json', HTTP_HOST='localhost'
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        return response
+
+    def get(self, path, **kwargs):
+        return self.client.get(path, HTTP_HOST='localhost', **kwargs)
+
+
+class OrderSearchTests(OrderAPITestCase):
+    def search(self, query):
+        response = self.get('/api/orders/search/', data={'q': query})
+        self.assertEqual(response.status_code, 200)
+        return [order['id'] for order in response.json()['results']]
+
+    def test_name_match_ranks_above_item_match(self):
+        self.create_order('ITEM', customer_name='John Smith')
+        self.create_order('NAME', customer_name='Sarah Pizzaiolo',
+                          items=[{'name': 'Caesar Salad', 'quantity': 1, 'price': '8.99'}])
+        self.assertEqual(self.search('pizz'), ['NAME', 'ITEM'])
+
+    def test_matches_phone_and_address_fragments(self):
+        self.create_order('A1')
+        self.assertEqual(self.search('555-0100'), ['A1'])
+        self.assertEqual(self.search('oak str'), ['A1'])
+        self.assertEqual(self.search('elm'), [])
+
+    def test_index_follows_create_and_delete(self):
+        self.assertEqual(self.search('emile'), [])
+        self.create_order('A1', customer_name='Émile Dubois')
+        self.assertEqual(self.search('emile'), ['A1'])
+
+        self.client.delete('/api/orders/A1/', HTTP_HOST='localhost')
+        self.assertFalse(Order.objects.filter(id='A1').exists())
+        self.assertEqual(self.search('emile'), [])
+
+    def test_query_syntax_is_escaped(self):
+        self.create_order('A1')
+        self.assertEqual(self.search('"pizza OR'), [])
+
+    def test_missing_query_is_rejected(self):
+        self.assertEqual(self.get('/api/orders/search/').status_code, 400)
+
+
+class ProductionQueueTests(OrderAPITestCase):
+    PIZZA = {'name': 'Margherita Pizza', 'quantity': 2, 'price': '6.25'}
+    SPICY_PIZZA = {'name': 'Margherita Pizza', 'quantity': 1, 'price': '6.25',
+                   'special_instructions': 'Extra spicy'}
+
+    def queue(self):
+        response = self.get('/api/orders/production-queue/')
+        self.assertEqual(response.status_code, 200)
+        return {(row['name'], row['special_instructions']): row['quantity'] for row in response.json()}
+
+    def test_pending_orders_are_not_queued(self):
+        self.create_order('A1')
+        self.assertEqual(self.queue(), {})
+
+    def test_totals_follow_status_transitions(self):
+        self.create_order('A1', items=[self.PIZZA, self.SPICY_PIZZA])
+        self.create_order('A2', items=[self.PIZZA], status='accepted')
+        self.assertEqual(self.queue(), {('Margherita Pizza', ''): 2})
+
+        self.set_status('A1', 'accepted')
+        self.assertEqual(self.queue(), {
+            ('Margherita Pizza', ''): 4,
+            ('Margherita Pizza', 'Extra spicy'): 1,
+        })
+
+        # accepted -> delayed keeps the order in the queue
+        self.set_status('A1', 'delayed')
+        self.assertEqual(self.queue()[('Margherita Pizza', '')], 4)
+
+        self.set_status('A1', 'ready')
+        self.assertEqual(self.queue(), {('Margherita Pizza', ''): 2})
+
+        self.client.delete('/api/orders/A2/', HTTP_HOST='localhost')
+        self.assertEqual(self.queue(), {})
+
+    def test_stale_concurrent_patch_does_not_double_count(self):
+        self.create_order('A1', status='accepted')
+        stale = Order.objects.get(id='A1')
+        self.set_status('A1', 'cancelled')
+
+        # A second PATCH that read the order before the first one committed
+        with mock.patch.object(OrderDetailView, 'get_object', return_value=stale):
+            self.set_status('A1', 'rejected')
+
+        self.assertEqual(Order.objects.get(id='A1').status, 'rejected')
+        self.assertEqual(ProductionQueueItem.objects.get().quantity, 0)
+
+    def test_etag_returns_304_until_totals_change(self):
+        self.create_order('A1', status='accepted')
+        etag = self.get('/api/orders/production-queue/')['ETag']
+        response = self.get('/api/orders/production-queue/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        self.set_status('A1', 'ready')
+        response = self.get('/api/orders/production-queue/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_etag_depends_on_format(self):
+        self.create_order('A1', status='accepted')
+        etag = self.get('/api/orders/production-queue/')['ETag']
+        response = self.get('/api/orders/production-queue/', HTTP_IF_NONE_MATCH=etag,
+                            HTTP_ACCEPT='application/x-msgpack')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/x-msgpack')
+
+    def test_rebuild_command_repairs_drift(self):
+        self.create_order('A1', status='accepted')
+        ProductionQueueItem.objects.update(quantity=7)
+
+        out = StringIO()
+        call_command('rebuild_production_queue', stdout=out)
+        self.assertIn('Found 1 drifted', out.getvalue())
+        self.assertEqual(ProductionQueueItem.objects.get().quantity, 7)
+
+        call_command('rebuild_production_queue', '--fix', stdout=StringIO())
+        self.assertEqual(self.queue(), {('Margherita Pizza', ''): 2})
+
+
+def unpack_tables(code, data):
+    """msgpack ext_hook turning TABLE_EXT_TYPE payloads back into lists of dicts"""
+    if code != TABLE_EXT_TYPE:
+        return msgpack.ExtType(code, data)
+    keys, rows = msgpack.unpackb(data, ext_hook=unpack_tables)
+    return [dict(zip(keys, row)) for row in rows]
+
+
+class CompactFormatTests(OrderAPITestCase):
+    def fetch(self, path):
+        as_json = self.get(path).json()
+        response = self.get(path, HTTP_ACCEPT='application/x-msgpack')
+        self.assertEqual(response['Content-Type'], 'application/x-msgpack')
+        return as_json, msgpack.unpackb(response.content, ext_hook=unpack_tables)
+
+    def assert_compact(self, compact, order):
+        """compact is the msgpack rendering of the JSON order"""
+        self.assertEqual(compact['total_amount'], int(Decimal(order['total_amount']) * 100))
+        for field in ('created_at', 'updated_at', 'ready_at', 'completed_at'):
+            if order[field] is None:
+                self.assertIsNone(compact[field])
+            else:
+                self.assertEqual(compact[field], int(parse_datetime(order[field]).timestamp() * 1000))
+        self.assertEqual(
+            compact['items'],
+            [{**item, 'price': int(Decimal(item['price']) * 100)} for item in order['items']],
+        )
+        untouched = set(order) - {'total_amount', 'created_at', 'updated_at', 'ready_at',
+                                  'completed_at', 'items'}
+        self.assertEqual({f: compact[f] for f in untouched}, {f: order[f] for f in untouched})
+
+    def test_list_round_trips_through_tables(self):
+        self.create_order('A1', items=[
+            {'name': 'Margherita Pizza', 'quantity': 2, 'price': '6.25'},
+            {'name': 'Crème brûlée', 'quantity': 1, 'price': '4.10', 'special_instructions': 'Warm'},
+        ])
+        self.create_order('A2', total_amount='0.99')
+        self.set_status('A2', 'ready')
+
+        as_json, compact = self.fetch('/api/orders/')
+        self.assertEqual([order['id'] for order in compact], [order['id'] for order in as_json])
+        for compact_order, order in zip(compact, as_json):
+            self.assert_compact(compact_order, order)
+        self.assertIsNotNone(compact[0]['ready_at'])
+        self.assertIsNone(compact[1]['ready_at'])
+
+    def test_detail_round_trips(self):
+        self.create_order('A1')
+        as_json, compact = self.fetch('/api/orders/A1/')
+        self.assert_compact(compact, as_json)
+
+
+class ItemsSnapshotTests(OrderAPITestCase):
+    def items(self, order_id):
+        response = self.get(f'/api/orders/{order_id}/')
+        self.assertEqual(response.status_code, 200)
+        return [(item['name'], item['quantity']) for item in response.json()['items']]
+
+    def test_orders_without_snapshot_fall_back_to_items(self):
+        self.create_order('A1')
+        Order.objects.filter(id='A1').update(items_snapshot=None)
+        self.assertEqual(self.items('A1'), [('Margherita Pizza', 2)])
+        self.assertEqual(self.get('/api/orders/').json()[0]['items'][0]['name'], 'Margherita Pizza')
+
+    def test_fix_rewrites_drifted_snapshot_and_changes_etag(self):
+        self.create_order('A1')
+        Order.objects.filter(id='A1').update(
+            items_snapshot=[{'name': 'Stale', 'quantity': 1, 'price': '1.00', 'special_instructions': None}]
+        )
+        etag = self.get('/api/orders/')['ETag']
+
+        out = StringIO()
+        call_command('check_items_snapshot', stdout=out)
+        self.assertIn('found 1 drifted', out.getvalue())
+        self.assertEqual(self.items('A1'), [('Stale', 1)])
+
+        call_command('check_items_snapshot', '--fix', stdout=StringIO())
+        self.assertEqual(self.items('A1'), [('Margherita Pizza', 2)])
+        self.assertEqual(self.get('/api/orders/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class OrderExportTests(OrderAPITestCase):
+    def export_csv(self):
+        response = self.get('/api/orders/export/', data={'output': 'csv'})
+        self.assertEqual(response.status_code, 200)
+        return list(csv.DictReader(StringIO(b''.join(response.streaming_content).decode())))
+
+    def export_ids(self, **params):
+        response = self.get('/api/orders/export/', data=params)
+        self.assertEqual(response.status_code, 200)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        return [json.loads(line)['id'] for line in lines]
+
+    def create_order_at(self, order_id, created_at, **kwargs):
+        self.create_order(order_id, **kwargs)
+        Order.objects.filter(id=order_id).update(created_at=parse_datetime(created_at))
+
+    def test_ndjson_streams_one_order_per_line_oldest_first(self):
+        self.create_order_at('NEW', '2024-03-02T10:00:00Z')
+        self.create_order_at('OLD', '2024-03-01T10:00:00Z', items=[
+            {'name': 'Caesar Salad', 'quantity': 1, 'price': '8.99'},
+            {'name': 'Cola', 'quantity': 2, 'price': '2.50'},
+        ])
+        response = self.get('/api/orders/export/')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="orders.ndjson"')
+        first, second = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual((first['id'], second['id']), ('OLD', 'NEW'))
+        self.assertEqual([item['name'] for item in first['items']], ['Caesar Salad', 'Cola'])
+
+    def test_csv_has_one_row_per_item(self):
+        self.create_order('A1', items=[
+            {'name': 'Caesar Salad', 'quantity': 1, 'price': '8.99'},
+            {'name': 'Cola', 'quantity': 2, 'price': '2.50'},
+        ])
+        rows = self.export_csv()
+        self.assertEqual([(row['id'], row['item_name']) for row in rows],
+                         [('A1', 'Caesar Salad'), ('A1', 'Cola')])
+
+    def test_date_bounds(self):
+        self.create_order_at('D1', '2024-03-01T23:59:00Z')
+        self.create_order_at('D2a', '2024-03-02T00:00:00Z')
+        self.create_order_at('D2b', '2024-03-02T23:30:00Z')
+        self.create_order_at('D3', '2024-03-03T00:00:00Z')
+
+        # A bare 'to' date includes that whole day
+        self.assertEqual(self.export_ids(**{'from': '2024-03-02', 'to': '2024-03-02'}), ['D2a', 'D2b'])
+        # A datetime 'to' is exclusive
+        self.assertEqual(self.export_ids(to='2024-03-02T23:30:00Z'), ['D1', 'D2a'])
+        self.assertEqual(self.export_ids(**{'from': '2024-03-02T12:00:00Z'}), ['D2b', 'D3'])
+
+    def test_status_filter(self):
+        self.create_order('S1')
+        self.create_order('S2', status='accepted')
+        self.create_order('S3', status='ready')
+        self.assertEqual(self.export_ids(status='accepted,ready'), ['S2', 'S3'])
+        self.assertEqual(self.export_ids(status='pending'), ['S1'])
+
+    def test_invalid_parameters_are_rejected(self):
+        for params in ({'from': 'yesterday'}, {'to': '2024-13-01'}, {'status': 'accepted,lost'},
+                       {'output': 'xml'}):
+            response = self.get('/api/orders/export/', data=params)
+            self.assertEqual(response.status_code, 400, params)
+
+    def test_formula_cells_are_neutralised(self):
+        self.create_order('A1', customer_name='=HYPERLINK("http://evil.example")',
+                          items=[{'name': '@SUM(A1:A9)', 'quantity': 1, 'price': '6.25',
+                                  'special_instructions': '-2+3'}])
+        row, = self.export_csv()
+        self.assertEqual(row['customer_name'], '\'=HYPERLINK("http://evil.example")')
+        self.assertEqual(row['item_name'], "'@SUM(A1:A9)")
+        self.assertEqual(row['item_special_instructions'], "'-2+3")
+        self.assertEqual(row['delivery_address'], '1 Oak Street')
+
+
+@override_settings(POLL_BURST=3, POLL_REFILL_RATE=0.5, POLL_CLIENTS_PER_ADDRESS=2)
+class PollPacingTests(OrderAPITestCase):
+    def poll(self, **headers):
+        return self.get('/api/orders/', **headers)
+
+    def test_empty_bucket_returns_429_with_retry_after(self):
+        self.create_order('A1')
+        for _ in range(3):
+            response = self.poll(HTTP_X_CLIENT_ID='tablet-1')
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('X-Poll-Interval', response)
+
+        response = self.poll(HTTP_X_CLIENT_ID='tablet-1')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '2')
+
+        # Other clients have their own bucket
+        self.assertEqual(self.poll(HTTP_X_CLIENT_ID='tablet-2').status_code, 200)
+
+    def test_bucket_refills_over_time(self):
+        for _ in range(3):
+            self.poll(HTTP_X_CLIENT_ID='tablet-1')
+        PollBucket.objects.filter(key='client:tablet-1').update(refilled_at=0)
+        self.assertEqual(self.poll(HTTP_X_CLIENT_ID='tablet-1').status_code, 200)
+
+    def test_304_carries_poll_interval(self):
+        self.create_order('A1')
+        etag = self.poll(HTTP_X_CLIENT_ID='tablet-1')['ETag']
+        response = self.poll(HTTP_X_CLIENT_ID='tablet-1', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(float(response['X-Poll-Interval']), 2.0)
+
+    def test_spoofed_forwarded_for_does_not_get_a_fresh_bucket(self):
+        for i in range(3):
+            self.poll(HTTP_X_FORWARDED_FOR=f'10.0.0.{i}')
+        response = self.poll(HTTP_X_FORWARDED_FOR='10.0.0.99')
+        self.assertEqual(response.status_code, 429)
+
+    def test_rotating_client_ids_share_the_address_bucket(self):
+        for i in range(6):
+            self.assertEqual(self.poll(HTTP_X_CLIENT_ID=f'tablet-{i}').status_code, 200)
+        self.assertEqual(self.poll(HTTP_X_CLIENT_ID='tablet-99').status_code, 429)
+        self.assertEqual(PollBucket.objects.filter(key__startswith='client:').count(), 6)
+
+    def test_pacing_state_stays_out_of_the_orders_database(self):
+        self.poll(HTTP_X_CLIENT_ID='tablet-1')
+        self.assertTrue(PollBucket.objects.using('pacing').exists())
+        self.assertNotIn('orders_pollbucket', connections['default'].introspection.table_names())
+
+    @override_settings(READ_REPLICAS=['replica1'])
+    @mock.patch('orders.routers.replica_lag', return_value=0.0)
+    def test_bucket_reads_ignore_read_replicas(self, replica_lag):
+        # 'replica1' isn't a configured database, so a bucket read routed there fails
+        request = RequestFactory().get('/api/orders/', HTTP_X_CLIENT_ID='tablet-1')
+        self.assertEqual([take_token(request) for _ in range(4)], [0, 0, 0, 2])
+        self.assertGreater(record_poll(), 0)
+
+    def test_locked_pacing_database_sheds_with_429(self):
+        with mock.patch('orders.pacing._spend', side_effect=OperationalError('database is locked')):
+            response = self.poll(HTTP_X_CLIENT_ID='tablet-1')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '2')
+
+
+@override_settings(
+    READ_REPLICAS=['replica1'],
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+)
+@mock.patch('orders.routers.replica_lag', return_value=0.0)
+class ReadYourWritesTests(OrderAPITestCase):
+    """'replica1' isn't a configured database, so any read routed to it fails"""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_client_reads_primary_after_its_write(self, replica_lag):
+        with override_settings(READ_REPLICAS=[]):
+            self.create_order('A1')
+        self.client.patch(
+            '/api/orders/A1/', json.dumps({'status': 'accepted', 'cancelled_by': 'kyte'}),
+            content_type='application/json', HTTP_HOST='localhost', HTTP_X_CLIENT_ID='tablet-1'
+        )
+        response = self.get('/api/orders/', HTTP_X_CLIENT_ID='tablet-1')
+        self.assertEqual(response.json()[0]['status'], 'accepted')
+
+    def test_other_clients_still_read_replicas(self, replica_lag):
+        from django.utils.connection import ConnectionDoesNotExist
+        with self.assertRaises(ConnectionDoesNotExist):
+            self.get('/api/orders/production-queue/', HTTP_X_CLIENT_ID='tablet-2')
+
+
+@override_settings(
+    READ_REPLICAS=['replica1'],
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+)
+class ReplicaLagTests(TransactionTestCase):
+    """'replica1' is a file copy of the test database, as made by refresh_read_replica.
+
+    A TransactionTestCase, so the copy sees committed orders.
+    """
+    databases = OrderAPITestCase.databases
+    create_order = OrderAPITestCase.create_order
+    get = OrderAPITestCase.get
+
+    def setUp(self):
+        cache.clear()
+        _lag_cache.clear()
+        fd, self.path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(fd)
+        connections.settings['replica1'] = {
+            **connections.settings['default'], 'NAME': f'file:{self.path}?mode=ro'
+        }
+        self.addCleanup(self.drop_replica)
+
+    def drop_replica(self):
+        connections['replica1'].close()
+        del connections['replica1']
+        del connections.settings['replica1']
+        os.remove(self.path)
+
+    def refresh_replica(self, refreshed_at):
+        connections['default'].ensure_connection()
+        copy = sqlite3.connect(self.path)
+        connections['default'].connection.backup(copy)
+        write_refresh_marker(copy, refreshed_at)
+        copy.close()
+        connections['replica1'].close()
+        _lag_cache.clear()
+
+    def listed(self):
+        # A client that made none of the writes, so it isn't pinned to the primary
+        response = self.get('/api/orders/', HTTP_X_CLIENT_ID='reader')
+        return sorted(order['id'] for order in response.json())
+
+    def test_unchanged_primary_keeps_using_an_old_copy(self):
+        self.create_order('L1')
+        self.refresh_replica(time.time() - 60)
+        Order.objects.filter(id='L1').update(customer_name='Only on the primary')
+        _lag_cache.clear()
+        # Same updated_at and count: the copy counts as current
+        self.assertEqual(self.get('/api/orders/', HTTP_X_CLIENT_ID='reader').json()[0]['customer_name'],
+                         'Jane Doe')
+
+    def test_recent_copy_serves_reads_within_max_lag(self):
+        self.create_order('L1')
+        self.refresh_replica(time.time())
+        self.create_order('L2')
+        self.assertEqual(self.listed(), ['L1'])
+
+    def test_copy_is_skipped_once_refreshes_stop(self):
+        self.create_order('L1')
+        self.refresh_replica(time.time() - 60)
+        self.create_order('L2')
+        self.assertEqual(self.listed(), ['L1', 'L2'])
+
+    def test_deletes_count_as_writes(self):
+        self.create_order('L1')
+        self.create_order('L2')
+        self.refresh_replica(time.time() - 60)
+        self.client.delete('/api/orders/L1/', HTTP_HOST='localhost')
+        self.assertEqual(self.listed(), ['L2'])
+
+    def test_unmarked_copy_is_never_read(self):
+        self.create_order('L1')
+        self.refresh_replica(time.time())
+        copy = sqlite3.connect(self.path)
+        copy.execute('DROP TABLE replica_refresh')
+        copy.commit()
+        copy.close()
+        self.assertEqual(replica_lag('replica1'), float('inf'))
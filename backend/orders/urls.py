@@ -3,5 +3,8 @@ from . import views
 
 urlpatterns = [
     path('orders/', views.OrderListCreateView.as_view(), name='order-list'),
+    path('orders/search/', views.OrderSearchView.as_view(), name='order-search'),
+    path('orders/production-queue/', views.ProductionQueueView.as_view(), name='production-queue'),
+    path('orders/export/', views.OrderExportView.as_view(), name='order-export'),
     path('orders/<str:pk>/', views.OrderDetailView.as_view(), name='order-detail'),
 ]
@@ -1,11 +1,25 @@
 from rest_framework import generics, status
+from rest_framework.permissions import SAFE_METHODS
 from rest_framework.response import Response
 from django.conf import settings
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from datetime import datetime, time as dt_time, timedelta
 import requests
 import logging
 import hashlib
+import time
+from .export import csv_rows, export_queryset, ndjson_rows
 from .models import Order, OrderItem
-from .serializers import OrderSerializer, OrderItemSerializer
+from .pacing import client_key, record_poll, recommended_interval, take_token
+from .production import apply_status_change, production_queue, production_queue_etag
+from .routers import client_pinned_to_primary, pin_client_to_primary, use_primary
+from .search import search_orders, unindex_order
+from .serializers import (
+    CompactOrderSerializer, OrderSerializer, OrderItemSerializer, ProductionQueueItemSerializer
+)
 
 logger = logging.getLogger(__name__)
 
@@ -16,7 +30,9 @@ def order_list_etag(request):
         return None
     latest = orders.first().updated_at.isoformat()
     count = orders.count()
-    etag_source = f"{latest}-{count}"
+    # JSON and msgpack bodies are different representations, so need distinct ETags
+    renderer = getattr(request, 'accepted_renderer', None)
+    etag_source = f"{latest}-{count}-{renderer.format if renderer else 'json'}"
     return hashlib.md5(etag_source.encode()).hexdigest()
 
 def notify_kyte_backend(order_id, order_status):
@@ -31,6 +47,8 @@ def notify_kyte_backend(order_id, order_status):
         response = requests.post(
             webhook_url,
             params=payload,
+            # Lets the receiver measure end-to-end webhook delay
+            headers={'X-Sent-At': f"{time.time():.6f}"},
             timeout=5
         )
         
@@ -43,7 +61,41 @@ def notify_kyte_backend(order_id, order_status):
         logger.error(f"Failed to notify Kyte backend for order {order_id}: {str(e)}")
         # Don't fail the request if webhook fails
 
-class OrderListCreateView(generics.ListCreateAPIView):
+class PrimaryForWritesMixin:
+    """Run writes, and the reads that build their responses, on the primary database.
+
+    A client that just wrote keeps reading from the primary for
+    REPLICA_MAX_LAG_SECONDS, so it never polls its own write away.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        if not settings.READ_REPLICAS:
+            return super().dispatch(request, *args, **kwargs)
+
+        key = client_key(request)
+        if request.method in SAFE_METHODS:
+            if not client_pinned_to_primary(key):
+                return super().dispatch(request, *args, **kwargs)
+            with use_primary():
+                return super().dispatch(request, *args, **kwargs)
+
+        with use_primary():
+            response = super().dispatch(request, *args, **kwargs)
+        if response.status_code < 400:
+            pin_client_to_primary(key)
+        return response
+
+class CompactFormatMixin:
+    """Serve orders with CompactOrderSerializer when msgpack was negotiated"""
+
+    def get_serializer_class(self):
+        renderer = getattr(self.request, 'accepted_renderer', None)
+        if renderer is not None and renderer.format == 'msgpack':
+            return CompactOrderSerializer
+        return super().get_serializer_class()
+
+
+class OrderListCreateView(CompactFormatMixin, PrimaryForWritesMixin, generics.ListCreateAPIView):
     serializer_class = OrderSerializer
     
     def get_queryset(self):
@@ -55,7 +107,19 @@ class OrderListCreateView(generics.ListCreateAPIView):
         return queryset
     
     def list(self, request, *args, **kwargs):
-        """Add ETag and conditional response support"""
+        """Add ETag, conditional response and server-driven poll pacing"""
+        # Token buckets live in the 'pacing' database, so floods are shed before any orders query
+        retry_after = take_token(request)
+        if retry_after:
+            response = Response(
+                {'error': 'Too many requests'},
+                status=status.HTTP_429_TOO_MANY_REQUESTS
+            )
+            response['Retry-After'] = str(retry_after)
+            return response
+
+        poll_interval = recommended_interval(record_poll())
+
         # Generate ETag for current data state
         etag = order_list_etag(request)
         
@@ -64,7 +128,9 @@ class OrderListCreateView(generics.ListCreateAPIView):
         
         if etag and if_none_match == etag:
             # Data hasn't changed, return 304 Not Modified
-            return Response(status=304)
+            response = Response(status=304)
+            response['X-Poll-Interval'] = str(poll_interval)
+            return response
         
         # Data has changed or no ETag provided, return full response
         response = super().list(request, *args, **kwargs)
@@ -79,38 +145,170 @@ class OrderListCreateView(generics.ListCreateAPIView):
             latest_update = queryset.order_by('-updated_at').first()
             response['Last-Modified'] = latest_update.updated_at.strftime('%a, %d %b %Y %H:%M:%S GMT')
         
+        response['X-Poll-Interval'] = str(poll_interval)
+        return response
+
+class OrderSearchView(CompactFormatMixin, PrimaryForWritesMixin, generics.GenericAPIView):
+    """Ranked full-text search over customer, address, instructions and item names"""
+    serializer_class = OrderSerializer
+    max_page_size = 100
+
+    def get(self, request, *args, **kwargs):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response(
+                {'error': 'Missing search query parameter "q"'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            page = max(int(request.query_params.get('page', 1)), 1)
+            page_size = min(max(int(request.query_params.get('page_size', 20)), 1), self.max_page_size)
+        except ValueError:
+            return Response(
+                {'error': 'page and page_size must be integers'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        count, orders = search_orders(query, limit=page_size, offset=(page - 1) * page_size)
+        return Response({
+            'count': count,
+            'page': page,
+            'page_size': page_size,
+            'results': self.get_serializer(orders, many=True).data,
+        })
+
+def parse_export_bound(value, end=False):
+    """Parse a from/to bound; a bare date covers that whole day"""
+    # Dates first: parse_datetime() also accepts a bare date, as midnight
+    day = parse_date(value)
+    if day is not None:
+        if end:
+            day += timedelta(days=1)
+        parsed = datetime.combine(day, dt_time.min)
+    else:
+        parsed = parse_datetime(value)
+        if parsed is None:
+            raise ValueError(value)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+class OrderExportView(generics.GenericAPIView):
+    """Stream order history as NDJSON or CSV without building it in memory"""
+    outputs = {
+        'ndjson': (ndjson_rows, 'application/x-ndjson'),
+        'csv': (csv_rows, 'text/csv'),
+    }
+
+    def get(self, request, *args, **kwargs):
+        # 'output' rather than 'format', which DRF reserves for renderer selection
+        output = request.query_params.get('output', 'ndjson')
+        if output not in self.outputs:
+            return Response(
+                {'error': f'output must be one of: {", ".join(self.outputs)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            created_from = request.query_params.get('from')
+            created_to = request.query_params.get('to')
+            created_from = parse_export_bound(created_from) if created_from else None
+            created_to = parse_export_bound(created_to, end=True) if created_to else None
+        except ValueError as e:
+            return Response(
+                {'error': f'Invalid date: {e}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        statuses = [s for s in request.query_params.get('status', '').split(',') if s]
+        valid_statuses = {choice for choice, _ in Order.STATUS_CHOICES}
+        if not set(statuses) <= valid_statuses:
+            return Response(
+                {'error': f'Invalid status: {", ".join(sorted(set(statuses) - valid_statuses))}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        rows, content_type = self.outputs[output]
+        queryset = export_queryset(created_from, created_to, statuses)
+        response = StreamingHttpResponse(rows(queryset), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="orders.{output}"'
+        # Stop nginx from buffering the whole export before forwarding it
+        response['X-Accel-Buffering'] = 'no'
         return response
 
-class OrderDetailView(generics.RetrieveUpdateDestroyAPIView):
+class ProductionQueueView(PrimaryForWritesMixin, generics.ListAPIView):
+    """What to cook now: item totals across accepted and delayed orders"""
+    serializer_class = ProductionQueueItemSerializer
+
+    def get_queryset(self):
+        return production_queue()
+
+    def list(self, request, *args, **kwargs):
+        etag = production_queue_etag(request)
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH', '').strip('"')
+        if etag and if_none_match == etag:
+            return Response(status=304)
+
+        response = super().list(request, *args, **kwargs)
+        if etag:
+            response['ETag'] = f'"{etag}"'
+        return response
+
+class OrderDetailView(CompactFormatMixin, PrimaryForWritesMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Order.objects.all()
     serializer_class = OrderSerializer
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            # Lock the row (on SQLite, take the write lock) before reading the
+            # status the production queue adjustment is based on
+            Order.objects.filter(pk=instance.pk).update(updated_at=timezone.now())
+            instance = Order.objects.select_for_update().get(pk=instance.pk)
+            apply_status_change(instance, instance.status, None)
+            unindex_order(instance.id)
+            instance.delete()
     
     def patch(self, request, *args, **kwargs):
-        from django.utils import timezone
-        
         order = self.get_object()
         new_status = request.data.get('status')
         cancelled_by = request.data.get('cancelled_by')
         
         if new_status in ['accepted', 'rejected', 'delayed', 'cancelled', 'ready', 'completed']:
-            old_status = order.status
-            order.status = new_status
-            
-            # Set ready_at timestamp when order is marked as ready
-            if new_status == 'ready' and old_status != 'ready':
-                order.ready_at = timezone.now()
-            
-            # Set completed_at timestamp when order is marked as completed
-            if new_status == 'completed' and old_status != 'completed':
-                order.completed_at = timezone.now()
-            
-            order.save()
+            # Compare-and-set on the status we read, so two concurrent PATCHes
+            # (e.g. a tablet and a Kyte cancel) can't both apply the same
+            # transition to the production queue
+            for _ in range(3):
+                old_status = order.status
+                now = timezone.now()
+                changes = {'status': new_status, 'updated_at': now}
+                
+                # Set ready_at timestamp when order is marked as ready
+                if new_status == 'ready' and old_status != 'ready':
+                    changes['ready_at'] = now
+                
+                # Set completed_at timestamp when order is marked as completed
+                if new_status == 'completed' and old_status != 'completed':
+                    changes['completed_at'] = now
+                
+                with transaction.atomic():
+                    updated = Order.objects.filter(pk=order.pk, status=old_status).update(**changes)
+                    if updated:
+                        apply_status_change(order, old_status, new_status)
+                order.refresh_from_db()
+                if updated:
+                    break
+            else:
+                return Response(
+                    {'error': 'Order was modified concurrently, please retry'},
+                    status=status.HTTP_409_CONFLICT
+                )
             
             # Only send webhook if status was changed by restaurant, not by Kyte
             if cancelled_by != 'kyte':
                 notify_kyte_backend(order.id, new_status)
             
-            return Response(OrderSerializer(order).data)
+            return Response(self.get_serializer(order).data)
         
         return Response(
             {'error': 'Invalid status'}, 
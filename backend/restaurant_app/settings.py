@@ -59,6 +59,37 @@ DATABASES = {
     }
 }
 
+# Read replicas for polling traffic. READ_REPLICAS is a comma-separated list of
+# SQLite files kept fresh by `manage.py refresh_read_replica`, or "wal" for a
+# read-only connection to the primary file (primary switches to WAL mode).
+# Writes and read-your-own-writes paths always use 'default'.
+READ_REPLICAS = []
+for i, replica in enumerate(filter(None, os.environ.get('READ_REPLICAS', '').split(','))):
+    alias = f'replica{i + 1}'
+    path = DATABASES['default']['NAME'] if replica.strip() == 'wal' else replica.strip()
+    DATABASES[alias] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': f'file:{path}?mode=ro',
+        'TEST': {'MIRROR': 'default'},
+    }
+    READ_REPLICAS.append(alias)
+
+# Poll pacing state (PollBucket, PollWindow) lives in its own SQLite file, so
+# polls never take the orders database's write lock. Create it with
+# `manage.py migrate --database pacing`.
+DATABASES['pacing'] = {
+    'ENGINE': 'django.db.backends.sqlite3',
+    'NAME': os.environ.get('PACING_DATABASE', BASE_DIR / 'pacing.sqlite3'),
+    # Give up quickly under contention; orders.pacing answers 429 instead
+    'OPTIONS': {'timeout': 0.5},
+}
+
+DATABASE_ROUTERS = ['orders.routers.PrimaryReplicaRouter']
+
+# Reads go to the primary when every replica trails it by more than this
+REPLICA_MAX_LAG_SECONDS = float(os.environ.get('REPLICA_MAX_LAG_SECONDS', 5))
+REPLICA_LAG_CHECK_INTERVAL = 1.0
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -105,12 +136,15 @@ CORS_ALLOW_HEADERS = [
     'x-requested-with',
     'if-none-match',
     'if-modified-since',
+    'x-client-id',
 ]
 
-# Expose ETag and Last-Modified headers to frontend
+# Expose ETag, Last-Modified and poll pacing headers to frontend
 CORS_EXPOSE_HEADERS = [
     'etag',
     'last-modified',
+    'retry-after',
+    'x-poll-interval',
 ]
 
 # REST Framework settings
@@ -120,8 +154,34 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_RENDERER_CLASSES': [
         'rest_framework.renderers.JSONRenderer',
+        'orders.renderers.MessagePackRenderer',
     ],
+    # Proxies in front of Django; only the X-Forwarded-For hops they append
+    # are trusted when identifying clients (0 = use REMOTE_ADDR)
+    'NUM_PROXIES': int(os.environ.get('NUM_PROXIES', 0)),
 }
 
+# Shared across gunicorn workers (LocMemCache would be per process)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('DJANGO_CACHE_DIR', BASE_DIR / '.cache'),
+    }
+}
+
+# Server-driven poll pacing for GET /api/orders/. Clients are told to poll
+# every POLL_MIN..POLL_MAX seconds (stretched when load exceeds
+# POLL_TARGET_RATE polls/s) and get 429 once their token bucket of
+# POLL_BURST tokens, refilled at POLL_REFILL_RATE per second, runs dry.
+# Each address also has a bucket POLL_CLIENTS_PER_ADDRESS times as large
+# (tablets behind one NAT share it), so changing X-Client-Id doesn't get a
+# client past its limit. State lives in the 'pacing' database.
+POLL_MIN_INTERVAL_SECONDS = 2
+POLL_MAX_INTERVAL_SECONDS = 30
+POLL_TARGET_RATE = float(os.environ.get('POLL_TARGET_RATE', 20))
+POLL_BURST = 5
+POLL_REFILL_RATE = 1.0
+POLL_CLIENTS_PER_ADDRESS = int(os.environ.get('POLL_CLIENTS_PER_ADDRESS', 10))
+
 # Kyte Backend Webhook URL
 KYTE_BACKEND_URL = os.environ.get('KYTE_BACKEND_URL', 'http://localhost:8001')
@@ -15,6 +15,9 @@ ALLOWED_HOSTS = [
     '127.0.0.1',
 ]
 
+# Requests pass through the ALB and nginx, each appending to X-Forwarded-For
+REST_FRAMEWORK['NUM_PROXIES'] = int(os.environ.get('NUM_PROXIES', 2))
+
 # Security settings
 SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
 SECURE_SSL_REDIRECT = False  # ALB handles SSL termination
@@ -38,11 +41,10 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 # Database - using SQLite for simplicity, can switch to PostgreSQL later
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+# Only 'default' is redefined so READ_REPLICAS aliases from settings.py survive
+DATABASES['default'] = {
+    'ENGINE': 'django.db.backends.sqlite3',
+    'NAME': BASE_DIR / 'db.sqlite3',
 }
 
 # Logging
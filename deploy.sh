@@ -43,6 +43,7 @@ pip install gunicorn
 echo "Running Django migrations..."
 cd backend
 python manage.py migrate --settings=restaurant_app.settings_production
+python manage.py migrate --database pacing --settings=restaurant_app.settings_production
 python manage.py collectstatic --noinput --settings=restaurant_app.settings_production
 cd ..
 
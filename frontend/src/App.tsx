@@ -9,7 +9,7 @@ import { useSmartPolling } from "./hooks/useSmartPolling";
 interface OrderItem {
   name: string;
   quantity: number;
-  price: number;
+  price: number | string;
   special_instructions?: string;
 }
 
@@ -19,12 +19,12 @@ interface Order {
   customer_name: string;
   customer_phone: string;
   delivery_address: string;
-  total_amount: number;
+  total_amount: number | string;
   status: string;
-  created_at: string;
-  updated_at: string;
-  ready_at?: string | null;
-  completed_at?: string | null;
+  created_at: string | number;
+  updated_at: string | number;
+  ready_at?: string | number | null;
+  completed_at?: string | number | null;
   special_instructions?: string;
   items: OrderItem[];
 }
@@ -38,6 +38,7 @@ function App() {
       baseInterval: 2000,
       maxInterval: 30000,
       backoffMultiplier: 1.5,
+      binary: true,
     })
   );
 
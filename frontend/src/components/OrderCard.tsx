@@ -1,11 +1,11 @@
 import React from 'react';
 import './OrderCard.css';
-import { formatOrderNumber } from '../utils/orderUtils';
+import { formatAmount, formatOrderNumber } from '../utils/orderUtils';
 
 interface OrderItem {
   name: string;
   quantity: number;
-  price: number;
+  price: number | string;
   special_instructions?: string;
 }
 
@@ -15,10 +15,10 @@ interface Order {
   customer_name: string;
   customer_phone: string;
   delivery_address: string;
-  total_amount: number;
+  total_amount: number | string;
   status: string;
-  created_at: string;
-  updated_at: string;
+  created_at: string | number;
+  updated_at: string | number;
   special_instructions?: string;
   items: OrderItem[];
 }
@@ -41,7 +41,7 @@ const OrderCard: React.FC<OrderCardProps> = ({ order, isSelected, onClick }) =>
     }
   };
 
-  const formatTime = (timestamp: string) => {
+  const formatTime = (timestamp: string | number) => {
     return new Date(timestamp).toLocaleTimeString('en-US', {
       hour: '2-digit',
       minute: '2-digit'
@@ -82,7 +82,7 @@ const OrderCard: React.FC<OrderCardProps> = ({ order, isSelected, onClick }) =>
         </div>
         
         <div className="order-total">
-          Total: ${order.total_amount}
+          Total: {formatAmount(order.total_amount)}
         </div>
       </div>
     </div>
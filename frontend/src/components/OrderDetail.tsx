@@ -1,11 +1,11 @@
 import React, { useState } from "react";
 import "./OrderDetail.css";
-import { formatOrderNumber } from "../utils/orderUtils";
+import { formatAmount, formatOrderNumber } from "../utils/orderUtils";
 
 interface OrderItem {
   name: string;
   quantity: number;
-  price: number;
+  price: number | string;
   special_instructions?: string;
 }
 
@@ -15,12 +15,12 @@ interface Order {
   customer_name: string;
   customer_phone: string;
   delivery_address: string;
-  total_amount: number;
+  total_amount: number | string;
   status: string;
-  created_at: string;
-  updated_at: string;
-  ready_at?: string | null;
-  completed_at?: string | null;
+  created_at: string | number;
+  updated_at: string | number;
+  ready_at?: string | number | null;
+  completed_at?: string | number | null;
   special_instructions?: string;
   items: OrderItem[];
 }
@@ -171,7 +171,7 @@ const OrderDetail: React.FC<OrderDetailProps> = ({
     }
   };
 
-  const formatDateTime = (timestamp: string) => {
+  const formatDateTime = (timestamp: string | number) => {
     return new Date(timestamp).toLocaleString("en-US", {
       year: "numeric",
       month: "short",
@@ -260,12 +260,12 @@ const OrderDetail: React.FC<OrderDetailProps> = ({
                     </span>
                   )}
                 </div>
-                <span className="item-price">${item.price}</span>
+                <span className="item-price">{formatAmount(item.price)}</span>
               </div>
             ))}
           </div>
           <div className="order-total">
-            <strong>Total: ${order.total_amount}</strong>
+            <strong>Total: {formatAmount(order.total_amount)}</strong>
           </div>
         </div>
 
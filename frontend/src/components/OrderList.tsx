@@ -5,7 +5,7 @@ import './OrderList.css';
 interface OrderItem {
   name: string;
   quantity: number;
-  price: number;
+  price: number | string;
   special_instructions?: string;
 }
 
@@ -14,10 +14,10 @@ interface Order {
   customer_name: string;
   customer_phone: string;
   delivery_address: string;
-  total_amount: number;
+  total_amount: number | string;
   status: string;
-  created_at: string;
-  updated_at: string;
+  created_at: string | number;
+  updated_at: string | number;
   special_instructions?: string;
   items: OrderItem[];
 }
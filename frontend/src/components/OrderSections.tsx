@@ -6,7 +6,7 @@ import "./OrderSections.css";
 interface OrderItem {
   name: string;
   quantity: number;
-  price: number;
+  price: number | string;
   special_instructions?: string;
 }
 
@@ -16,12 +16,12 @@ interface Order {
   customer_name: string;
   customer_phone: string;
   delivery_address: string;
-  total_amount: number;
+  total_amount: number | string;
   status: string;
-  created_at: string;
-  updated_at: string;
-  ready_at?: string | null;
-  completed_at?: string | null;
+  created_at: string | number;
+  updated_at: string | number;
+  ready_at?: string | number | null;
+  completed_at?: string | number | null;
   special_instructions?: string;
   items: OrderItem[];
 }
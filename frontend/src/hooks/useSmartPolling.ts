@@ -11,7 +11,11 @@ interface UseSmartPollingResult<T> {
 }
 
 export function useSmartPolling<T>(
-  fetchFn: () => Promise<{ notModified: boolean; data: T | null }>,
+  fetchFn: () => Promise<{
+    notModified: boolean;
+    data: T | null;
+    nextInterval?: number;
+  }>,
   baseInterval = 2000,
   maxInterval = 30000
 ): UseSmartPollingResult<T> {
@@ -51,6 +55,12 @@ export function useSmartPolling<T>(
         setCurrentInterval(intervalRef.current);
       }
 
+      // Server-driven pacing takes precedence over local backoff
+      if (result.nextInterval) {
+        intervalRef.current = result.nextInterval;
+        setCurrentInterval(intervalRef.current);
+      }
+
       setIsLoading(false);
     } catch (error) {
       console.error('Error fetching orders:', error);
@@ -1,14 +1,38 @@
 import axios from "axios";
+import { decodeMsgPack } from "../utils/msgpack";
 
 const API_BASE_URL = process.env.REACT_APP_API_URL || "/api";
 
+// Stable per-tablet id: the server throttles each client separately and
+// serves a client's reads from the primary right after its own writes
+const getClientId = (): string => {
+  const key = "kyteClientId";
+  let id = localStorage.getItem(key);
+  if (!id) {
+    id = `${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 10)}`;
+    localStorage.setItem(key, id);
+  }
+  return id;
+};
+
 const api = axios.create({
   baseURL: API_BASE_URL,
   headers: {
     "Content-Type": "application/json",
+    "X-Client-Id": getClientId(),
   },
 });
 
+export const MSGPACK_MEDIA_TYPE = "application/x-msgpack";
+
+// Request config for the binary format; 304 responses have no body to decode
+export const binaryRequestConfig = {
+  responseType: "arraybuffer" as const,
+  headers: { Accept: MSGPACK_MEDIA_TYPE },
+  transformResponse: (data: ArrayBuffer) =>
+    data && data.byteLength ? decodeMsgPack(data) : null,
+};
+
 export const getOrders = () => {
   return api.get("/orders/");
 };
@@ -32,6 +56,22 @@ export const getOrder = (id: string) => {
   return api.get(`/orders/${id}/`);
 };
 
+export const searchOrders = (query: string, page = 1, pageSize = 20) => {
+  return api.get("/orders/search/", {
+    params: { q: query, page, page_size: pageSize },
+  });
+};
+
+export const getProductionQueueConditional = (etag?: string) => {
+  const headers: any = {};
+  if (etag) headers["If-None-Match"] = etag;
+
+  return api.get("/orders/production-queue/", {
+    headers,
+    validateStatus: (status) => status === 200 || status === 304,
+  });
+};
+
 export const updateOrderStatus = (id: string, status: string) => {
   return api.patch(`/orders/${id}/`, { status });
 };
@@ -0,0 +1,74 @@
+/**
+ * @jest-environment node
+ */
+import { decodeMsgPack } from "./msgpack";
+
+const fromHex = (hex: string): ArrayBuffer =>
+  new Uint8Array(hex.match(/../g)!.map((byte) => parseInt(byte, 16))).buffer;
+
+test("decodes keyed-once order tables with nested item tables", () => {
+  // msgpack.packb(tabulate(orders)) as rendered by MessagePackRenderer
+  const payload =
+    "c7e8019296a26964ac746f74616c5f616d6f756e74aa637265617465645f6174a872656164795f6174b4" +
+    "7370656369616c5f696e737472756374696f6e73a56974656d739296a24131cd04e2cf000001a153e63d" +
+    "b6c0b84372c3a86d65206272c3bb6cc3a9652c206e6f206e757473c735019293a46e616d65a87175616e" +
+    "74697479a570726963659293b04d6172676865726974612050697a7a6102cd027193a4436f6c61010096" +
+    "a24132d1fed4cf000001a153e63fe7cf000001a153e6d840d928" +
+    "78".repeat(40) +
+    "90";
+
+  expect(decodeMsgPack(fromHex(payload))).toEqual([
+    {
+      id: "A1",
+      total_amount: 1250,
+      created_at: 1792408960438,
+      ready_at: null,
+      special_instructions: "Crème brûlée, no nuts",
+      items: [
+        { name: "Margherita Pizza", quantity: 2, price: 625 },
+        { name: "Cola", quantity: 1, price: 0 },
+      ],
+    },
+    {
+      id: "A2",
+      total_amount: -300,
+      created_at: 1792408960999,
+      ready_at: 1792409000000,
+      special_instructions: "x".repeat(40),
+      items: [],
+    },
+  ]);
+});
+
+test("decodes scalar types and long containers", () => {
+  const payload =
+    "88" +
+    "a5636f756e74ce00011170" + // count: 70000
+    "a26f6bc3" + // ok: true
+    "a26e6fc2" + // no: false
+    "a166cb3ff8000000000000" + // f: 1.5
+    "a36e6567d2ffff63c0" + // neg: -40000
+    "a3626967cf0000010000000000" + // big: 2 ** 40
+    "a46c697374dc0014000102030405060708090a0b0c0d0e0f10111213" + // list: 0..19
+    "a173da012c" +
+    "79".repeat(300); // s: "y" * 300
+
+  expect(decodeMsgPack(fromHex(payload))).toEqual({
+    count: 70000,
+    ok: true,
+    no: false,
+    f: 1.5,
+    neg: -40000,
+    big: 2 ** 40,
+    list: Array.from({ length: 20 }, (_, i) => i),
+    s: "y".repeat(300),
+  });
+});
+
+test("returns null for an empty body", () => {
+  expect(decodeMsgPack(new ArrayBuffer(0))).toBeNull();
+});
+
+test("rejects unknown extension types", () => {
+  expect(() => decodeMsgPack(fromHex("d40700"))).toThrow(/extension type 7/);
+});
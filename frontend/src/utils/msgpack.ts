@@ -0,0 +1,135 @@
+// Extension type the server uses for keyed-once tables: [keys, rows]
+const TABLE_EXT_TYPE = 1;
+
+const utf8 = new TextDecoder();
+
+// Minimal MessagePack decoder covering everything the orders API emits
+// (maps, arrays, strings, ints, floats, booleans, nil and keyed-once
+// tables). Amounts stay integer cents and timestamps epoch milliseconds;
+// see formatAmount() in utils/orderUtils.
+export const decodeMsgPack = (buffer: ArrayBuffer): any => {
+  const view = new DataView(buffer);
+  const bytes = new Uint8Array(buffer);
+  let pos = 0;
+
+  const str = (length: number) => {
+    // Short ASCII strings (most field values) are cheaper to build by hand
+    // than through TextDecoder
+    if (length < 64) {
+      let value = "";
+      let i = pos;
+      const end = pos + length;
+      for (; i < end; i++) {
+        const byte = bytes[i];
+        if (byte > 0x7f) break;
+        value += String.fromCharCode(byte);
+      }
+      if (i === end) {
+        pos = end;
+        return value;
+      }
+    }
+    const value = utf8.decode(bytes.subarray(pos, pos + length));
+    pos += length;
+    return value;
+  };
+  const array = (length: number) => {
+    const value = new Array(length);
+    for (let i = 0; i < length; i++) value[i] = read();
+    return value;
+  };
+  const map = (length: number) => {
+    const value: Record<string, any> = {};
+    for (let i = 0; i < length; i++) {
+      const key = read();
+      value[key] = read();
+    }
+    return value;
+  };
+  const uint = (size: number) => {
+    let value: number;
+    if (size === 1) value = view.getUint8(pos);
+    else if (size === 2) value = view.getUint16(pos);
+    else if (size === 4) value = view.getUint32(pos);
+    else value = view.getUint32(pos) * 4294967296 + view.getUint32(pos + 4);
+    pos += size;
+    return value;
+  };
+  const int = (size: number) => {
+    let value: number;
+    if (size === 1) value = view.getInt8(pos);
+    else if (size === 2) value = view.getInt16(pos);
+    else if (size === 4) value = view.getInt32(pos);
+    else value = view.getInt32(pos) * 4294967296 + view.getUint32(pos + 4);
+    pos += size;
+    return value;
+  };
+  const arrayLength = () => {
+    const type = bytes[pos++];
+    if (type >= 0x90 && type <= 0x9f) return type & 0x0f;
+    if (type === 0xdc) return uint(2);
+    if (type === 0xdd) return uint(4);
+    throw new Error(`Expected MessagePack array, got 0x${type.toString(16)}`);
+  };
+  // Rows are turned straight into objects without intermediate arrays
+  const table = () => {
+    arrayLength();
+    const keys: string[] = read();
+    const rows = new Array(arrayLength());
+    for (let r = 0; r < rows.length; r++) {
+      arrayLength();
+      const row: Record<string, any> = {};
+      for (let k = 0; k < keys.length; k++) row[keys[k]] = read();
+      rows[r] = row;
+    }
+    return rows;
+  };
+  const ext = (length: number) => {
+    const type = view.getInt8(pos++);
+    if (type === TABLE_EXT_TYPE) return table();
+    throw new Error(`Unsupported MessagePack extension type ${type} (${length} bytes)`);
+  };
+
+  const read = (): any => {
+    const type = bytes[pos++];
+    if (type <= 0x7f) return type;
+    if (type <= 0x8f) return map(type & 0x0f);
+    if (type <= 0x9f) return array(type & 0x0f);
+    if (type <= 0xbf) return str(type & 0x1f);
+    if (type >= 0xe0) return type - 0x100;
+    switch (type) {
+      case 0xc0: return null;
+      case 0xc2: return false;
+      case 0xc3: return true;
+      case 0xc7: return ext(uint(1));
+      case 0xc8: return ext(uint(2));
+      case 0xc9: return ext(uint(4));
+      case 0xca: pos += 4; return view.getFloat32(pos - 4);
+      case 0xcb: pos += 8; return view.getFloat64(pos - 8);
+      case 0xcc: return uint(1);
+      case 0xcd: return uint(2);
+      case 0xce: return uint(4);
+      case 0xcf: return uint(8);
+      case 0xd0: return int(1);
+      case 0xd1: return int(2);
+      case 0xd2: return int(4);
+      case 0xd3: return int(8);
+      case 0xd4: return ext(1);
+      case 0xd5: return ext(2);
+      case 0xd6: return ext(4);
+      case 0xd7: return ext(8);
+      case 0xd8: return ext(16);
+      case 0xd9: return str(uint(1));
+      case 0xda: return str(uint(2));
+      case 0xdb: return str(uint(4));
+      case 0xdc: return array(uint(2));
+      case 0xdd: return array(uint(4));
+      case 0xde: return map(uint(2));
+      case 0xdf: return map(uint(4));
+      default:
+        throw new Error(`Unsupported MessagePack type 0x${type.toString(16)}`);
+    }
+  };
+
+  return buffer.byteLength ? read() : null;
+};
@@ -1,14 +1,18 @@
-import api from "../services/api";
+import api, { binaryRequestConfig } from "../services/api";
 
 interface TransportConfig {
   baseInterval: number;
   maxInterval: number;
   backoffMultiplier: number;
+  // Request the compact MessagePack encoding instead of JSON
+  binary?: boolean;
 }
 
 interface FetchResult {
   notModified: boolean;
   data: any;
+  // Server-recommended delay before the next poll, in milliseconds
+  nextInterval?: number;
 }
 
 export class SmartPollingTransport {
@@ -25,6 +29,9 @@ export class SmartPollingTransport {
 
   async fetchOrders(since?: string): Promise<FetchResult> {
     const headers: Record<string, string> = {};
+    if (this.config.binary) {
+      Object.assign(headers, binaryRequestConfig.headers);
+    }
 
     // Add conditional request headers
     if (this.lastETag) {
@@ -41,19 +48,30 @@ export class SmartPollingTransport {
 
     try {
       const response = await api.get(url, {
+        ...(this.config.binary ? binaryRequestConfig : {}),
         headers,
-        validateStatus: (status) => status === 200 || status === 304,
+        validateStatus: (status) =>
+          status === 200 || status === 304 || status === 429,
       });
 
+      // Throttled: keep current data and wait as long as the server asks
+      if (response.status === 429) {
+        const retryAfter = Number(response.headers["retry-after"]) || 1;
+        this.interval = Math.max(retryAfter * 1000, this.interval);
+        return { notModified: true, data: null, nextInterval: this.interval };
+      }
+
       // Handle 304 Not Modified
       if (response.status === 304) {
         this.onNoChange();
-        return { notModified: true, data: null };
+        this.applyServerInterval(response.headers["x-poll-interval"]);
+        return { notModified: true, data: null, nextInterval: this.interval };
       }
 
       // Handle successful response
       if (response.status === 200) {
         this.onDataChanged();
+        this.applyServerInterval(response.headers["x-poll-interval"]);
 
         // Update cached headers
         const newETag = response.headers["etag"] || response.headers["ETag"];
@@ -65,7 +83,7 @@ export class SmartPollingTransport {
         if (newLastModified) this.lastModified = newLastModified;
 
         const data = response.data;
-        return { notModified: false, data };
+        return { notModified: false, data, nextInterval: this.interval };
       }
 
       throw new Error(`HTTP ${response.status}: ${response.statusText}`);
@@ -94,6 +112,15 @@ export class SmartPollingTransport {
     this.interval = this.config.baseInterval;
   }
 
+  // The server's recommendation (seconds) overrides local backoff, since it
+  // knows about recent changes and current load across all tablets
+  private applyServerInterval(header?: string): void {
+    const seconds = Number(header);
+    if (header && seconds > 0) {
+      this.interval = seconds * 1000;
+    }
+  }
+
   getNextInterval(): number {
     return this.interval;
   }
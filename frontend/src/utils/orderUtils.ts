@@ -18,3 +18,14 @@ export function formatOrderNumber(order: { id: string; display_number?: number }
   return `#${order.id.slice(-3)}`;
 }
 
+
+/**
+ * Format an order or item amount. The binary (msgpack) API sends integer
+ * cents, the JSON API a decimal string.
+ */
+export function formatAmount(amount: number | string): string {
+  if (typeof amount === 'number') {
+    return `$${(amount / 100).toFixed(2)}`;
+  }
+  return `$${amount}`;
+}
@@ -1,13 +1,18 @@
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel, Field, model_validator
+from collections import deque
+import asyncio
 import requests
 import json
 import random
+import statistics
 import time
 import hashlib
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from urllib.parse import parse_qsl
+from typing import List, Dict, Any, Literal, Optional
 
 app = FastAPI(title="Mock Kyte Backend")
 
@@ -23,6 +28,159 @@ app.add_middleware(
 # Restaurant API endpoint
 RESTAURANT_API_URL = "http://localhost:8000/api"
 
+# ---------------------------------------------------------------------------
+# Fault injection: simulate a slow, flaky or down Kyte for the webhook routes
+# ---------------------------------------------------------------------------
+
+class LatencyConfig(BaseModel):
+    distribution: Literal["none", "fixed", "uniform", "normal", "exponential"] = "none"
+    ms: float = 0            # fixed value, normal mean or exponential mean
+    min_ms: float = 0        # uniform lower bound
+    max_ms: float = 0        # uniform upper bound
+    stddev_ms: float = 0     # normal standard deviation
+
+class OutageWindow(BaseModel):
+    start_in: float = 0      # seconds from now
+    duration: float          # seconds
+    mode: Literal["error", "timeout", "reset"] = "error"
+
+class FaultConfig(BaseModel):
+    latency: LatencyConfig = LatencyConfig()
+    error_rate: float = Field(0, ge=0, le=100)    # percent of requests answered with error_status
+    error_status: int = Field(503, ge=400, le=599)
+    timeout_rate: float = Field(0, ge=0, le=100)  # percent of requests that hang for timeout_seconds
+    timeout_seconds: float = 30
+    reset_rate: float = Field(0, ge=0, le=100)    # percent of connections dropped mid-response
+    outages: List[OutageWindow] = []
+
+    @model_validator(mode="after")
+    def check_rates(self):
+        # choose_fault() rolls one number across all three rates
+        total = self.reset_rate + self.timeout_rate + self.error_rate
+        if total > 100:
+            raise ValueError(f"reset_rate + timeout_rate + error_rate is {total}%, must be at most 100%")
+        return self
+
+fault_config = FaultConfig()
+# Absolute (starts_at, ends_at, mode) outage windows derived from fault_config
+outage_schedule: List[tuple] = []
+# Per-request receipt timing for webhook calls
+webhook_timings = deque(maxlen=5000)
+
+def sample_latency(latency: LatencyConfig) -> float:
+    """Injected delay in seconds for one request"""
+    if latency.distribution == "fixed":
+        ms = latency.ms
+    elif latency.distribution == "uniform":
+        ms = random.uniform(latency.min_ms, latency.max_ms)
+    elif latency.distribution == "normal":
+        ms = random.gauss(latency.ms, latency.stddev_ms)
+    elif latency.distribution == "exponential":
+        ms = random.expovariate(1 / latency.ms) if latency.ms > 0 else 0
+    else:
+        ms = 0
+    return max(ms, 0) / 1000
+
+def choose_fault() -> Optional[str]:
+    """Pick the fault for this request: an active outage wins, then random rolls"""
+    now = time.time()
+    for starts_at, ends_at, mode in outage_schedule:
+        if starts_at <= now < ends_at:
+            return f"outage-{mode}"
+    roll = random.uniform(0, 100)
+    if roll < fault_config.reset_rate:
+        return "reset"
+    roll -= fault_config.reset_rate
+    if roll < fault_config.timeout_rate:
+        return "timeout"
+    roll -= fault_config.timeout_rate
+    if roll < fault_config.error_rate:
+        return "error"
+    return None
+
+class ConnectionReset(Exception):
+    """Raised after the response has started so uvicorn drops the connection"""
+
+class FaultInjectionMiddleware:
+    """ASGI middleware applying fault_config to /webhook/* and recording timings"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith("/webhook/"):
+            await self.app(scope, receive, send)
+            return
+
+        received_at = time.time()
+        headers = dict(scope.get("headers") or [])
+        sent_at = headers.get(b"x-sent-at")
+        query = dict(parse_qsl(scope.get("query_string", b"").decode()))
+        record = {
+            "path": scope["path"],
+            "order_id": query.get("order_id"),
+            "status": query.get("status"),
+            "received_at": received_at,
+            "webhook_delay_ms": (received_at - float(sent_at)) * 1000 if sent_at else None,
+            "fault": None,
+            "injected_delay_ms": 0.0,
+            "response_status": None,
+            "handled_ms": None,
+        }
+        webhook_timings.append(record)
+
+        fault = choose_fault()
+        record["fault"] = fault
+        delay = 0.0 if fault and fault.startswith("outage") else sample_latency(fault_config.latency)
+        if fault in ("timeout", "outage-timeout"):
+            delay += fault_config.timeout_seconds
+        record["injected_delay_ms"] = delay * 1000
+        if delay:
+            await asyncio.sleep(delay)
+
+        try:
+            if fault in ("reset", "outage-reset"):
+                record["response_status"] = "reset"
+                await send({"type": "http.response.start", "status": 200,
+                            "headers": [(b"content-length", b"64")]})
+                raise ConnectionReset()
+            if fault in ("error", "outage-error"):
+                response = JSONResponse(
+                    status_code=fault_config.error_status,
+                    content={"detail": f"Injected fault: {fault}"},
+                )
+                record["response_status"] = fault_config.error_status
+                await response(scope, receive, send)
+                return
+
+            async def record_send(message):
+                if message["type"] == "http.response.start":
+                    record["response_status"] = message["status"]
+                await send(message)
+
+            await self.app(scope, receive, record_send)
+        finally:
+            record["handled_ms"] = (time.time() - received_at) * 1000
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return round(ordered[index], 2)
+
+def summarize(values: List[float]) -> Dict[str, Any]:
+    return {
+        "count": len(values),
+        "mean": round(statistics.mean(values), 2) if values else None,
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": round(max(values), 2) if values else None,
+    }
+
+app.add_middleware(FaultInjectionMiddleware)
+
 # Sample menu items for generating orders
 MENU_ITEMS = [
     {"name": "Margherita Pizza", "price": 12.99},
@@ -243,6 +401,98 @@ async def cancel_order(order_id: str):
             detail="Restaurant API is not available"
         )
 
+@app.get("/admin/faults")
+async def get_faults():
+    """Current fault injection settings and the absolute outage schedule"""
+    return {
+        "config": fault_config.model_dump(),
+        "outage_schedule": [
+            {"starts_at": starts_at, "ends_at": ends_at, "mode": mode}
+            for starts_at, ends_at, mode in outage_schedule
+        ],
+    }
+
+@app.put("/admin/faults")
+async def set_faults(config: FaultConfig):
+    """Replace the fault injection settings; outage windows start relative to now"""
+    global fault_config, outage_schedule
+    now = time.time()
+    fault_config = config
+    outage_schedule = [
+        (now + outage.start_in, now + outage.start_in + outage.duration, outage.mode)
+        for outage in config.outages
+    ]
+    print(f"[FAULTS] Updated fault injection config: {config.model_dump()}")
+    return await get_faults()
+
+@app.delete("/admin/faults")
+async def clear_faults():
+    """Back to a healthy Kyte that answers immediately"""
+    return await set_faults(FaultConfig())
+
+@app.get("/admin/webhook-timings")
+async def get_webhook_timings(limit: int = 100):
+    """Recorded webhook receipts with delay summaries (milliseconds)"""
+    records = list(webhook_timings)
+    delays = [r["webhook_delay_ms"] for r in records if r["webhook_delay_ms"] is not None]
+    handled = [r["handled_ms"] for r in records if r["handled_ms"] is not None]
+    faults: Dict[str, int] = {}
+    for r in records:
+        key = r["fault"] or "none"
+        faults[key] = faults.get(key, 0) + 1
+    return {
+        "webhook_delay_ms": summarize(delays),
+        "handled_ms": summarize(handled),
+        "faults": faults,
+        "recent": records[-limit:] if limit > 0 else [],
+    }
+
+@app.delete("/admin/webhook-timings")
+async def clear_webhook_timings():
+    webhook_timings.clear()
+    return {"message": "Webhook timings cleared"}
+
+@app.post("/benchmark/patch-latency")
+def benchmark_patch_latency(order_id: str, count: int = 10, timeout: float = 10):
+    """Measure staff-visible PATCH latency under the current fault scenario.
+
+    Alternates the order between accepted and delayed as the restaurant
+    would, so each PATCH triggers a webhook back to this server. Declared
+    sync so it runs in the threadpool and the event loop stays free to
+    answer those webhooks. A PATCH that takes longer than `timeout`
+    seconds is abandoned and counted as an error.
+    """
+    samples = []
+    errors = 0
+    timeouts = 0
+    for i in range(count):
+        new_status = "accepted" if i % 2 == 0 else "delayed"
+        started = time.perf_counter()
+        try:
+            response = requests.patch(
+                f"{RESTAURANT_API_URL}/orders/{order_id}/",
+                json={"status": new_status},
+                headers={"Content-Type": "application/json"},
+                timeout=timeout
+            )
+            if response.status_code != 200:
+                errors += 1
+        except requests.exceptions.Timeout:
+            errors += 1
+            timeouts += 1
+        except requests.exceptions.RequestException:
+            errors += 1
+        samples.append((time.perf_counter() - started) * 1000)
+
+    return {
+        "order_id": order_id,
+        "scenario": fault_config.model_dump(),
+        "errors": errors,
+        "timeouts": timeouts,
+        "patch_ms": summarize(samples),
+        "samples": [round(sample, 2) for sample in samples],
+    }
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8001)